@@ -6,7 +6,9 @@ import signal
 import sys
 import glob
 import json
+import copy
 import logging
+import functools
 from time import sleep
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -21,25 +23,26 @@ DEVICE_FILE = "/sys/devices/virtual/dmi/id/product_name"
 CONFIG_FILE = "/etc/omen-fan/config.json"
 LOG_DIR = "/var/log/omen-fan"
 
-def get_hwmon_file(pattern: str, description: str) -> str:
-    try:
-        files = glob.glob(pattern)
-        if not files:
-            raise FileNotFoundError(f"No {description} file found with pattern: {pattern}")
-        return files[0]
-    except Exception as e:
-        logging.error(f"Failed to find {description}: {e}")
-        sys.exit(1)
+HWMON_PATTERN = "/sys/devices/platform/hp-wmi/hwmon/*/{}"
+
+@functools.cache
+def _hwmon_path(name: str) -> str:
+    # The sysfs layout is stable within a boot, so reuse the path cached in the config when it still exists.
+    paths = CONFIG["paths"]
+    if name in paths and os.path.exists(paths[name]):
+        return paths[name]
+
+    files = glob.glob(HWMON_PATTERN.format(name))
+    if not files:
+        raise FileNotFoundError(f"No hwmon file found for {name}")
 
-def get_hwmon_files():
-    global BOOST_FILE, FAN1_SPEED_FILE, FAN2_SPEED_FILE
-    if 'BOOST_FILE' not in globals():
-        BOOST_FILE = get_hwmon_file("/sys/devices/platform/hp-wmi/hwmon/*/pwm1_enable", "boost control")
-        FAN1_SPEED_FILE = get_hwmon_file("/sys/devices/platform/hp-wmi/hwmon/*/fan1_input", "fan1 speed")
-        FAN2_SPEED_FILE = get_hwmon_file("/sys/devices/platform/hp-wmi/hwmon/*/fan2_input", "fan2 speed")
-BOOST_FILE = glob.glob("/sys/devices/platform/hp-wmi/hwmon/*/pwm1_enable")[0]
-FAN1_SPEED_FILE = glob.glob("/sys/devices/platform/hp-wmi/hwmon/*/fan1_input")[0]
-FAN2_SPEED_FILE = glob.glob("/sys/devices/platform/hp-wmi/hwmon/*/fan2_input")[0]
+    paths[name] = files[0]
+    if is_root(1):
+        try:
+            save_config(CONFIG)
+        except IOError:
+            pass  # Caching the path is best effort; save_config already logged it.
+    return files[0]
 
 FAN1_OFFSET = 52  # 0x34
 FAN2_OFFSET = 53  # 0x35
@@ -47,6 +50,9 @@ BIOS_OFFSET = 98  # 0x62
 TIMER_OFFSET = 99  # 0x63
 BOOST_OFFSET = 236  # 0xEC
 
+BIOS_SETTLE_TRIES = 20
+BIOS_SETTLE_DELAY = 0.0005
+
 FAN1_SPEED_MAX = 55
 FAN2_SPEED_MAX = 57
 DEVICE_LIST = ["OMEN by HP Laptop 16"]
@@ -62,7 +68,8 @@ DEFAULT_CONFIG = {
     },
     "script": {
         "BYPASS_DEVICE_CHECK": False
-    }
+    },
+    "paths": {}
 }
 
 def setup_logging():
@@ -84,26 +91,32 @@ def setup_logging():
         )
 
 def load_config() -> dict:
-    if not os.path.isfile(CONFIG_FILE):
-        return DEFAULT_CONFIG.copy()
-    
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return copy.deepcopy(DEFAULT_CONFIG)
+    return _load_config(mtime)
+
+@functools.lru_cache(maxsize=1)
+def _load_config(mtime: int) -> dict:
     try:
         with open(CONFIG_FILE, "r") as file:
             config = json.load(file)
-            merged_config = DEFAULT_CONFIG.copy()
+            merged_config = copy.deepcopy(DEFAULT_CONFIG)
             for section in merged_config:
                 if section in config:
                     merged_config[section].update(config[section])
             return merged_config
     except (json.JSONDecodeError, IOError) as e:
         logging.error(f"Failed to load config: {e}")
-        return DEFAULT_CONFIG.copy()
+        return copy.deepcopy(DEFAULT_CONFIG)
 
 def save_config(config: dict):
     try:
         os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
         with open(CONFIG_FILE, "w") as file:
             json.dump(config, file, indent=2)
+        _load_config.cache_clear()
     except IOError as e:
         logging.error(f"Failed to save config: {e}")
         raise
@@ -117,14 +130,20 @@ def validate_config(config: dict) -> bool:
         if len(temp_curve) != len(speed_curve):
             raise ValueError("TEMP_CURVE and SPEED_CURVE must have same length")
         
-        if not all(temp_curve[i] <= temp_curve[i + 1] for i in range(len(temp_curve) - 1)):
+        if not temp_curve:
+            raise ValueError("TEMP_CURVE and SPEED_CURVE must not be empty")
+
+        if temp_curve != sorted(temp_curve):
             raise ValueError("TEMP_CURVE must be in ascending order")
             
-        if not all(0 <= speed <= 100 for speed in speed_curve):
+        if min(speed_curve) < 0 or max(speed_curve) > 100:
             raise ValueError("SPEED_CURVE values must be between 0-100")
+
+        if service["POLL_INTERVAL"] <= 0:
+            raise ValueError("POLL_INTERVAL must be greater than 0")
             
         return True
-    except (KeyError, ValueError) as e:
+    except (KeyError, ValueError, TypeError) as e:
         logging.error(f"Config validation failed: {e}")
         return False
 
@@ -132,7 +151,7 @@ def safe_ec_read(offset: int, default: int = 0) -> int:
     try:
         with open(ECIO_FILE, "rb") as ec:
             ec.seek(offset)
-            return int.from_bytes(ec.read(1), "big")
+            return ec.read(1)[0]
     except (IOError, OSError) as e:
         logging.warning(f"EC read failed at offset {offset}: {e}")
         return default
@@ -148,6 +167,39 @@ def safe_ec_write(offset: int, value: int) -> bool:
         return False
 
 
+def read_ipc_pid() -> Optional[int]:
+    try:
+        fd = os.open(IPC_FILE, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        pid = int(os.read(fd, 16))
+    except ValueError:
+        # The daemon may be midway through writing the file; leave it alone.
+        return None
+    finally:
+        os.close(fd)
+
+    # A reused PID must not be signalled, so check that the process really is omen-fand.
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as cmdline:
+            if b"omen-fand" in cmdline.read():
+                return pid
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    except OSError:
+        # /proc may hide other users' processes (hidepid), so we cannot tell it is stale.
+        return None
+
+    # The PID file was left behind by a service that was killed unexpectedly.
+    logging.warning("omen-fan service was killed unexpectedly, removing stale PID file")
+    try:
+        os.remove(IPC_FILE)
+    except OSError as e:
+        logging.warning(f"Failed to remove stale PID file: {e}")
+    return None
+
+
 def is_root(state=0):
     if os.geteuid() != 0:
         if state == 1:
@@ -173,14 +225,14 @@ def startup_check():
     
     if not validate_config(config):
         logging.error("Invalid configuration, using defaults")
-        config = DEFAULT_CONFIG.copy()
+        config = copy.deepcopy(DEFAULT_CONFIG)
         if is_root(1):
             save_config(config)
     
     return config
 
 def device_check():
-    config = load_config()
+    config = CONFIG
     
     try:
         with open(DEVICE_FILE, "r") as device_file:
@@ -212,7 +264,7 @@ def device_check():
 
 def load_ec_module():
     try:
-        if "ec_sys" not in str(subprocess.check_output("lsmod")):
+        if not os.path.isdir("/sys/module/ec_sys"):
             subprocess.run(["modprobe", "ec_sys", "write_support=1"], check=True)
             logging.info("Loaded ec_sys module")
 
@@ -233,60 +285,80 @@ def update_fan(speed1, speed2):
     print(f"  Set Fan1: {speed1*100} RPM, Set Fan2: {speed2*100} RPM")
     with open(ECIO_FILE, "r+b") as ec:
         ec.seek(FAN1_OFFSET)
-        ec.write(bytes([speed1]))
-        ec.seek(FAN2_OFFSET)
-        ec.write(bytes([speed2]))
+        ec.write(bytes([speed1, speed2]))
 
 
 def bios_control(enabled):
     if enabled is False:
-        print("  WARNING: BIOS Fan Control Disabled")
-        with open(ECIO_FILE, "r+b") as ec:
+        with open(ECIO_FILE, "r+b", buffering=0) as ec:
             ec.seek(BIOS_OFFSET)
             ec.write(bytes([6]))
-            sleep(0.1)
+            # Wait for the EC to latch the write, but never longer than ~10ms.
+            for _ in range(BIOS_SETTLE_TRIES):
+                ec.seek(BIOS_OFFSET)
+                if ec.read(1)[0] == 6:
+                    break
+                sleep(BIOS_SETTLE_DELAY)
+            else:
+                logging.error("EC did not confirm BIOS control was disabled")
+                print("  ERROR: Failed to disable BIOS Fan Control")
+                sys.exit(1)
             ec.seek(TIMER_OFFSET)
             ec.write(bytes([0]))
+        print("  WARNING: BIOS Fan Control Disabled")
     elif enabled is True:
         print("  The BIOS now controls Fans")
         with open(ECIO_FILE, "r+b") as ec:
             ec.seek(BIOS_OFFSET)
             ec.write(bytes([0]))
             ec.seek(FAN1_OFFSET)
-            ec.write(bytes([0]))
-            ec.seek(FAN2_OFFSET)
-            ec.write(bytes([0]))
+            ec.write(bytes([0, 0]))
     else:
         print("  ERROR: Needs a boolean value (0 or 1)")
         sys.exit(1)
 
 
+def watch_fans(interval: float):
+    # Keep the sysfs descriptors open and pread from offset 0 instead of reopening every sample.
+    fan1 = os.open(_hwmon_path("fan1_input"), os.O_RDONLY)
+    fan2 = os.open(_hwmon_path("fan2_input"), os.O_RDONLY)
+    try:
+        while True:
+            sleep(interval)
+            rpm1 = os.pread(fan1, 16, 0).decode().strip()
+            rpm2 = os.pread(fan2, 16, 0).decode().strip()
+            print(f"  Fan 1 : {rpm1} RPM, Fan 2 : {rpm2} RPM")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.close(fan1)
+        os.close(fan2)
+
+
 def parse_rpm(rpm, fan, max_speed):
-    is_percent = 0
-    if "%" in rpm:
-        rpm = rpm.replace("%", "")
-        is_percent = 1
+    is_percent = rpm.endswith("%")
+    value = rpm[:-1] if is_percent else rpm
     try:
-        rpm = int(rpm)
+        value = int(value)
     except ValueError:
-        print(f"  ERROR: '{rpm}' is not a valid integer.")
+        print(f"  ERROR: '{value}' is not a valid integer.")
         sys.exit(1)
 
-    if is_percent == 1 and (rpm < 0 or rpm > 100):
-        print(f"  ERROR: '{rpm}' is not a valid percentage.")
-        sys.exit(1)
-    elif is_percent == 1:
-        return int(max_speed * rpm / 100)
-    elif 0 <= rpm <= max_speed:
-        return int(rpm)
-    else:
+    if is_percent:
+        if not 0 <= value <= 100:
+            print(f"  ERROR: '{value}' is not a valid percentage.")
+            sys.exit(1)
+        return int(max_speed * value / 100)
+
+    if not 0 <= value <= max_speed:
         print(
-            f"  ERROR: '{rpm}' is not a valid RPM/100 value for Fan{fan}. Min: 0 Max: {max_speed}"
+            f"  ERROR: '{value}' is not a valid RPM/100 value for Fan{fan}. Min: 0 Max: {max_speed}"
         )
         sys.exit(1)
+    return value
 
 
-startup_check()
+CONFIG = startup_check()
 
 
 @click.group(cls=ClickAliasedGroup)
@@ -309,12 +381,16 @@ def boost_cli(arg):
     is_root()
     device_check()
     load_ec_module()
-    get_hwmon_files()
+    try:
+        boost_file = _hwmon_path("pwm1_enable")
+    except FileNotFoundError as e:
+        logging.error(f"Failed to find boost control: {e}")
+        sys.exit(1)
     if arg is False:
-        with open(BOOST_FILE, "r+", encoding="utf-8") as file:
+        with open(boost_file, "r+", encoding="utf-8") as file:
             file.write("2")
     elif arg is True:
-        with open(BOOST_FILE, "r+", encoding="utf-8") as file:
+        with open(boost_file, "r+", encoding="utf-8") as file:
             file.write("0")
 
 
@@ -332,14 +408,14 @@ def boost_cli(arg):
     help="Comma-separated list of speed curve values",
 )
 @click.option("--idle-speed", type=click.IntRange(0, 100), help="Idle fan speed value")
-@click.option("--poll-interval", type=click.FLOAT, help="Poll interval in seconds")
+@click.option("--poll-interval", type=click.FloatRange(min=0, min_open=True), help="Poll interval in seconds")
 @click.option("--temp-smoothing", type=bool, help="Enable temperature smoothing")
 @click.option("--hysteresis", type=click.IntRange(1, 10), help="Temperature hysteresis")
 @click.option("--view", is_flag=True, help="Show current config")
 def configure_cli(temp_curve, speed_curve, idle_speed, poll_interval, temp_smoothing, hysteresis, view):
     is_root()
     
-    config = load_config()
+    config = CONFIG
     
     if view:
         print(json.dumps(config, indent=2))
@@ -372,6 +448,14 @@ def configure_cli(temp_curve, speed_curve, idle_speed, poll_interval, temp_smoot
     save_config(config)
     print("  Configuration updated successfully")
 
+    pid = read_ipc_pid()
+    if pid is not None:
+        try:
+            os.kill(pid, signal.SIGHUP)
+            print("  omen-fan service has reloaded the configuration")
+        except ProcessLookupError:
+            print("  PID file exists without a process.")
+
 
 @cli.command(name="service", aliases=["e"], help="Start/Stop Fan management service")
 @click.argument("arg", type=str)
@@ -379,25 +463,24 @@ def service_cli(arg):
     is_root()
     device_check()
     load_ec_module()
+    pid = read_ipc_pid()
     if arg in ["start", "1"]:
-        if os.path.isfile(IPC_FILE):
-            with open(IPC_FILE, "r", encoding="utf-8") as ipc:
-                print(f"  omen-fan service is already running with PID:{ipc.read()}")
+        if pid is not None:
+            print(f"  omen-fan service is already running with PID:{pid}")
         else:
             bios_control(False)
             subprocess.Popen("omen-fand")
             print("  omen-fan service has been started")
 
     elif arg in ["stop", "0"]:
-        if os.path.isfile(IPC_FILE):
-            with open(IPC_FILE, "r", encoding="utf-8") as ipc:
-                try:
-                    os.kill(int(ipc.read()), signal.SIGTERM)
-                except ProcessLookupError:
-                    print(" PID file exists without a process.")
-                    print(" omen-fan service was killed unexpectedly.")
-                    os.remove(IPC_FILE)
-                    sys.exit(1)
+        if pid is not None:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                print(" PID file exists without a process.")
+                print(" omen-fan service was killed unexpectedly.")
+                os.remove(IPC_FILE)
+                sys.exit(1)
 
             print("  omen-fan service has been stopped")
             bios_control(True)
@@ -409,37 +492,39 @@ def service_cli(arg):
 
 
 @cli.command(name="info", aliases=["i"], help="Gets Fan status")
-def info_cli():
-    if os.path.isfile(IPC_FILE):
-        with open(IPC_FILE, "r", encoding="utf-8") as ipc:
-            print(f"  Service Status : Running (PID: {ipc.read()})")
-            print("  BIOS Control : Disabled")
+@click.option("--watch", type=click.FloatRange(min=0, min_open=True), help="Keep printing fan speeds every N seconds")
+def info_cli(watch):
+    pid = read_ipc_pid()
+    if pid is not None:
+        print(f"  Service Status : Running (PID: {pid})")
+        print("  BIOS Control : Disabled")
     else:
         print("  Service Status : Stopped")
         if is_root(1):
             load_ec_module()
-            with open(ECIO_FILE, "rb") as ec:
-                ec.seek(BIOS_OFFSET)
-                if int.from_bytes(ec.read(1), "big") == 6:
-                    print("  BIOS Control : Disabled")
-                else:
-                    print("  BIOS Control : Enabled")
+            if safe_ec_read(BIOS_OFFSET) == 6:
+                print("  BIOS Control : Disabled")
+            else:
+                print("  BIOS Control : Enabled")
         else:
             print("  BIOS Control : Unknown (Need root)")
 
     try:
-        get_hwmon_files()
-        with open(FAN1_SPEED_FILE, "r", encoding="utf-8") as fan1:
+        with open(_hwmon_path("fan1_input"), "r", encoding="utf-8") as fan1:
             print(f"  Fan 1 : {fan1.read().strip()} RPM")
-        with open(FAN2_SPEED_FILE, "r", encoding="utf-8") as fan2:
+        with open(_hwmon_path("fan2_input"), "r", encoding="utf-8") as fan2:
             print(f"  Fan 2 : {fan2.read().strip()} RPM")
 
-        with open(BOOST_FILE, "r", encoding="utf-8") as boost:
+        with open(_hwmon_path("pwm1_enable"), "r", encoding="utf-8") as boost:
             if boost.read().strip() == "0":
                 print("\n  Fan Boost : Enabled")
                 print("  Fan speeds are now maxed. BIOS and User controls are ignored")
     except Exception:
         print("  Fan Status : Unable to read (hwmon not available)")
+        return
+
+    if watch:
+        watch_fans(watch)
 
 
 @cli.command(
@@ -454,7 +539,7 @@ def set_cli(arg1, arg2):
     is_root()
     device_check()
     load_ec_module()
-    if os.path.isfile(IPC_FILE):
+    if read_ipc_pid() is not None:
         print("  WARNING: omen-fan service running, may override fan speed")
     if arg2 is None:
         update_fan(
@@ -4,8 +4,9 @@ import os
 import signal
 import sys
 import json
+import ctypes
 import logging
-from time import sleep
+from time import sleep, monotonic
 from bisect import bisect_left
 from collections import deque
 from logging.handlers import RotatingFileHandler
@@ -25,6 +26,11 @@ GPU_TEMP_OFFSET = 183
 FAN1_MAX = 55
 FAN2_MAX = 57
 
+# The EC timer only needs refreshing before it runs out, not on every poll.
+BIOS_RESET_PERIOD = 5.0
+BIOS_SETTLE_TRIES = 20
+BIOS_SETTLE_DELAY = 0.0005
+
 DEFAULT_CONFIG = {
     "service": {
         "TEMP_CURVE": [50, 60, 70, 80, 87, 93],
@@ -36,6 +42,21 @@ DEFAULT_CONFIG = {
     }
 }
 
+CLOCK_MONOTONIC = 1
+TFD_CLOEXEC = 0o2000000
+TFD_TIMER_ABSTIME = 1
+
+
+class Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class Itimerspec(ctypes.Structure):
+    _fields_ = [("it_interval", Timespec), ("it_value", Timespec)]
+
+
+libc = ctypes.CDLL(None, use_errno=True)
+
 def setup_logging():
     os.makedirs(LOG_DIR, exist_ok=True)
     handler = RotatingFileHandler(
@@ -49,15 +70,17 @@ def setup_logging():
         handlers=[handler]
     )
 
-def load_config():
+def load_config(strict=False):
     try:
         with open(CONFIG_FILE, "r") as file:
             config = json.load(file)
-            merged_config = DEFAULT_CONFIG.copy()
+            merged_config = DEFAULT_CONFIG["service"].copy()
             if "service" in config:
-                merged_config["service"].update(config["service"])
-            return merged_config["service"]
+                merged_config.update(config["service"])
+            return merged_config
     except (FileNotFoundError, json.JSONDecodeError) as e:
+        if strict:
+            raise
         logging.warning(f"Config load failed, using defaults: {e}")
         return DEFAULT_CONFIG["service"]
 
@@ -66,10 +89,15 @@ class TemperatureFilter:
         self.window = deque(maxlen=window_size)
         self.hysteresis = hysteresis
         self.last_speed = 0
+        self._sum = 0
     
     def smooth_temp(self, temp):
+        # Keep a running sum so each sample costs O(1) regardless of window size.
+        if len(self.window) == self.window.maxlen:
+            self._sum -= self.window[0]
         self.window.append(temp)
-        return sum(self.window) / len(self.window)
+        self._sum += temp
+        return self._sum / len(self.window)
     
     def apply_hysteresis(self, new_speed):
         if abs(new_speed - self.last_speed) < self.hysteresis:
@@ -77,23 +105,67 @@ class TemperatureFilter:
         self.last_speed = new_speed
         return new_speed
 
-config = load_config()
-TEMP_CURVE = config["TEMP_CURVE"]
-SPEED_CURVE = config["SPEED_CURVE"]
-IDLE_SPEED = config["IDLE_SPEED"]
-POLL_INTERVAL = config["POLL_INTERVAL"]
-TEMP_SMOOTHING = config["TEMP_SMOOTHING"]
-HYSTERESIS = config["HYSTERESIS"]
+def calc_slopes(temp_curve, speed_curve):
+    # Precalculate slopes to reduce compute time.
+    slope = []
+    for i in range(1, len(temp_curve)):
+        speed_diff = speed_curve[i] - speed_curve[i - 1]
+        temp_diff = temp_curve[i] - temp_curve[i - 1]
+        slope.append(round(speed_diff / temp_diff, 2))
+    return slope
 
-temp_filter = TemperatureFilter(hysteresis=HYSTERESIS)
 
-# Precalculate slopes to reduce compute time.
-slope = []
-for i in range(1, len(TEMP_CURVE)):
-    speed_diff = SPEED_CURVE[i] - SPEED_CURVE[i - 1]
-    temp_diff = TEMP_CURVE[i] - TEMP_CURVE[i - 1]
-    slope_val = round(speed_diff / temp_diff, 2)
-    slope.append(slope_val)
+def eval_speed(temp, temp_curve, speed_curve, slope, idle_speed):
+    if temp <= temp_curve[0]:
+        return idle_speed
+    if temp >= temp_curve[-1]:
+        return speed_curve[-1]
+    i = bisect_left(temp_curve, temp)
+    y0 = speed_curve[i - 1]
+    x0 = temp_curve[i - 1]
+    return y0 + slope[i - 1] * (temp - x0)
+
+
+def build_tables(config):
+    # The EC reports temperatures as a single byte, so the whole curve fits in 256 entries.
+    temp_curve = config["TEMP_CURVE"]
+    speed_curve = config["SPEED_CURVE"]
+    slope = calc_slopes(temp_curve, speed_curve)
+    speeds = tuple(
+        eval_speed(temp, temp_curve, speed_curve, slope, config["IDLE_SPEED"])
+        for temp in range(256)
+    )
+    fan1 = bytes(int(FAN1_MAX * speed / 100) for speed in speeds)
+    fan2 = bytes(int(FAN2_MAX * speed / 100) for speed in speeds)
+    return speeds, fan1, fan2
+
+
+def apply_config(config):
+    global TEMP_CURVE, SPEED_CURVE, IDLE_SPEED, POLL_INTERVAL, TEMP_SMOOTHING, HYSTERESIS
+    global SPEED_TABLE, FAN1_TABLE, FAN2_TABLE
+    # Build everything first so a bad config raises before any global is touched.
+    tables = build_tables(config)
+    poll_interval = config["POLL_INTERVAL"]
+    if not isinstance(poll_interval, (int, float)) or poll_interval <= 0:
+        poll_interval = DEFAULT_CONFIG["service"]["POLL_INTERVAL"]
+        logging.warning(f"Invalid POLL_INTERVAL {config['POLL_INTERVAL']!r}, using {poll_interval}")
+    values = (
+        config["TEMP_CURVE"],
+        config["SPEED_CURVE"],
+        config["IDLE_SPEED"],
+        poll_interval,
+        config["TEMP_SMOOTHING"],
+        config["HYSTERESIS"],
+    )
+    TEMP_CURVE, SPEED_CURVE, IDLE_SPEED, POLL_INTERVAL, TEMP_SMOOTHING, HYSTERESIS = values
+    SPEED_TABLE, FAN1_TABLE, FAN2_TABLE = tables
+
+
+setup_logging()
+logging.info("omen-fand starting up")
+
+apply_config(load_config())
+temp_filter = TemperatureFilter(hysteresis=HYSTERESIS)
 
 
 def is_root():
@@ -104,89 +176,142 @@ def is_root():
 
 
 def sig_handler(signum, frame):
-    os.remove("/tmp/omen-fand.PID")
+    try:
+        os.remove(IPC_FILE)
+    except FileNotFoundError:
+        pass
     bios_control(True)
+    os.close(ECIO_FD)
     sys.exit()
 
 
+def reload_handler(signum, frame):
+    global speed_old
+    try:
+        apply_config(load_config(strict=True))
+    except Exception as e:
+        # Raising here would surface wherever the main loop was interrupted.
+        logging.error(f"Config reload failed, keeping current config: {e}")
+        return
+    temp_filter.hysteresis = HYSTERESIS
+    # Force the next poll to write speeds from the new curve.
+    speed_old = -1
+    logging.info("Configuration reloaded")
+
+
 def update_fan(speed1, speed2):
-    with open(ECIO_FILE, "r+b") as ec:
-        ec.seek(FAN1_OFFSET)
-        ec.write(bytes([int(speed1)]))
-        ec.seek(FAN2_OFFSET)
-        ec.write(bytes([int(speed2)]))
+    # FAN1_OFFSET and FAN2_OFFSET are adjacent, so both fit in one write.
+    os.pwrite(ECIO_FD, bytes([int(speed1), int(speed2)]), FAN1_OFFSET)
 
 
 def get_temp():
-    with open(ECIO_FILE, "rb") as ec:
-        ec.seek(CPU_TEMP_OFFSET)
-        temp_c = int.from_bytes(ec.read(1), "big")
-        ec.seek(GPU_TEMP_OFFSET)
-        temp_g = int.from_bytes(ec.read(1), "big")
-    return max(temp_c, temp_g)
+    return max(
+        os.pread(ECIO_FD, 1, CPU_TEMP_OFFSET)[0],
+        os.pread(ECIO_FD, 1, GPU_TEMP_OFFSET)[0],
+    )
+
+
+def create_timer():
+    tfd = libc.timerfd_create(CLOCK_MONOTONIC, TFD_CLOEXEC)
+    if tfd < 0:
+        raise OSError(ctypes.get_errno(), "timerfd_create failed")
+    return tfd
+
+
+def wait_until(deadline):
+    # time.monotonic() reads CLOCK_MONOTONIC, so its values work as absolute timerfd deadlines.
+    sec = int(deadline)
+    nsec = int((deadline - sec) * 1e9)
+    spec = Itimerspec(Timespec(0, 0), Timespec(sec, nsec))
+    if libc.timerfd_settime(TIMER_FD, TFD_TIMER_ABSTIME, ctypes.byref(spec), None) < 0:
+        raise OSError(ctypes.get_errno(), "timerfd_settime failed")
+    os.read(TIMER_FD, 8)
 
 
 def bios_control(enabled):
     if enabled is False:
-        with open(ECIO_FILE, "r+b") as ec:
-            ec.seek(BIOS_OFFSET)
-            ec.write(bytes([6]))
-            sleep(0.1)
-            ec.seek(TIMER_OFFSET)
-            ec.write(bytes([0]))
+        # Check the EC on every refresh: the timer, suspend/resume or the CLI can hand control back to the BIOS.
+        if os.pread(ECIO_FD, 1, BIOS_OFFSET)[0] != 6:
+            os.pwrite(ECIO_FD, bytes([6]), BIOS_OFFSET)
+            # Wait for the EC to latch the write, but never longer than ~10ms.
+            for _ in range(BIOS_SETTLE_TRIES):
+                if os.pread(ECIO_FD, 1, BIOS_OFFSET)[0] == 6:
+                    break
+                sleep(BIOS_SETTLE_DELAY)
+            else:
+                logging.warning("EC did not confirm BIOS control was disabled")
+                return False
+            # Whoever handed control back to the BIOS may have reset the fans too, so restore our last speeds.
+            if last_fan1 >= 0:
+                update_fan(last_fan1, last_fan2)
+        os.pwrite(ECIO_FD, bytes([0]), TIMER_OFFSET)
+        return True
     elif enabled is True:
-        with open(ECIO_FILE, "r+b") as ec:
-            ec.seek(BIOS_OFFSET)
-            ec.write(bytes([0]))
-            ec.seek(FAN1_OFFSET)
-            ec.write(bytes([0]))
-            ec.seek(FAN2_OFFSET)
-            ec.write(bytes([0]))
+        os.pwrite(ECIO_FD, bytes([0]), BIOS_OFFSET)
+        os.pwrite(ECIO_FD, bytes([0, 0]), FAN1_OFFSET)
 
 
-signal.signal(signal.SIGTERM, sig_handler)
+speed_old = -1
+last_fan1 = last_fan2 = -1
+is_root()
 
-setup_logging()
-logging.info("omen-fand starting up")
+# Keep the EC open for the lifetime of the daemon instead of reopening it every poll.
+ECIO_FD = os.open(ECIO_FILE, os.O_RDWR)
+# Absolute timerfd deadlines keep the poll cadence fixed regardless of time spent in the loop.
+TIMER_FD = create_timer()
+
+# Install the handlers only once ECIO_FD exists, since sig_handler needs it to restore BIOS control.
+signal.signal(signal.SIGTERM, sig_handler)
+signal.signal(signal.SIGHUP, reload_handler)
 
 with open(IPC_FILE, "w", encoding="utf-8") as ipc:
     ipc.write(str(os.getpid()))
 
-speed_old = -1
-is_root()
+# Temperature sampling and the BIOS timer refresh run on independent deadlines.
+next_temp = next_bios = monotonic()
 
 while True:
     try:
-        temp = get_temp()
-        
-        if TEMP_SMOOTHING:
-            temp = temp_filter.smooth_temp(temp)
-
-        if temp <= TEMP_CURVE[0]:
-            speed = IDLE_SPEED
-        elif temp >= TEMP_CURVE[-1]:
-            speed = SPEED_CURVE[-1]
-        else:
-            i = bisect_left(TEMP_CURVE, temp)
-            y0 = SPEED_CURVE[i - 1]
-            x0 = TEMP_CURVE[i - 1]
-            speed = y0 + slope[i - 1] * (temp - x0)
-
-        speed = temp_filter.apply_hysteresis(speed)
-
-        if speed_old != speed:
-            speed_old = speed
-            fan1_speed = int(FAN1_MAX * speed / 100)
-            fan2_speed = int(FAN2_MAX * speed / 100)
-            update_fan(fan1_speed, fan2_speed)
-            logging.debug(f"Temp: {temp:.1f}°C, Speed: {speed:.1f}%, Fan1: {fan1_speed}, Fan2: {fan2_speed}")
-
-        bios_control(False)
-        sleep(POLL_INTERVAL)
-        
+        now = monotonic()
+
+        if now >= next_temp:
+            missed = int((now - next_temp) // POLL_INTERVAL)
+            if missed:
+                logging.warning(f"Missed {missed} poll tick(s)")
+            next_temp += (missed + 1) * POLL_INTERVAL
+
+            temp = get_temp()
+
+            if TEMP_SMOOTHING:
+                temp = round(temp_filter.smooth_temp(temp))
+
+            speed = temp_filter.apply_hysteresis(SPEED_TABLE[temp])
+
+            if speed_old != speed:
+                speed_old = speed
+                fan1_speed = FAN1_TABLE[temp]
+                fan2_speed = FAN2_TABLE[temp]
+                # Different percentages can quantize to the same EC bytes; skip those writes.
+                if (fan1_speed, fan2_speed) != (last_fan1, last_fan2):
+                    last_fan1, last_fan2 = fan1_speed, fan2_speed
+                    update_fan(fan1_speed, fan2_speed)
+                    logging.debug("Temp: %.1f°C, Speed: %.1f%%, Fan1: %d, Fan2: %d", temp, speed, fan1_speed, fan2_speed)
+
+        if now >= next_bios:
+            next_bios = now + BIOS_RESET_PERIOD
+            if not bios_control(False):
+                # Retry on the next poll instead of waiting a full refresh period.
+                next_bios = next_temp
+
+        wait_until(min(next_temp, next_bios))
+
     except KeyboardInterrupt:
         logging.info("Received keyboard interrupt, shutting down")
         break
     except Exception as e:
         logging.error(f"Unexpected error in main loop: {e}")
-        sleep(POLL_INTERVAL)
+        try:
+            wait_until(min(next_temp, next_bios))
+        except Exception as e:
+            logging.error(f"Poll timer failed, handing fan control back to the BIOS: {e}")
+            sig_handler(signal.SIGTERM, None)